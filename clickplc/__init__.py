@@ -5,6 +5,9 @@ Distributed under the GNU General Public License v2
 Copyright (C) 2019 NuMat Technologies
 """
 from clickplc.driver import ClickPLC
+from clickplc.pool import ClickPLCPool
+
+__all__ = ['ClickPLC', 'ClickPLCPool', 'command_line']
 
 
 def command_line(args=None):
@@ -25,16 +28,20 @@ def command_line(args=None):
             if args.tags_file is not None:
                 d = await plc.get()
             else:
-                d = await plc.get('x001-x816')
-                d.update(await plc.get('y001-y816'))
-                d.update(await plc.get('c1-c100'))
-                d.update(await plc.get('df1-df100'))
-                d.update(await plc.get('ds1-ds100'))
-                d.update(await plc.get('ctd1-ctd250'))
+                d = await plc.get_many(['x001-x816', 'y001-y816', 'c1-c100',
+                                        'df1-df100', 'ds1-ds100', 'ctd1-ctd250'])
             print(json.dumps(d, indent=4))
 
-    loop = asyncio.new_event_loop()
-    loop.run_until_complete(get())
+    run = asyncio.run
+    try:  # uvloop is optional; it trims per-request overhead when polling quickly
+        import uvloop
+    except ImportError:
+        pass
+    else:
+        run = getattr(uvloop, 'run', run)  # uvloop.run is new in 0.18
+        if run is asyncio.run:
+            uvloop.install()
+    run(get())
 
 
 if __name__ == '__main__':
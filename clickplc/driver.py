@@ -7,17 +7,157 @@ Copyright (C) 2020 NuMat Technologies
 """
 from __future__ import annotations
 
+import asyncio
 import copy
 import csv
-import pydoc
+import functools
+import os
+import re
+import struct
+import warnings
+from bisect import bisect_left, bisect_right
 from collections import defaultdict
-from string import digits
 from typing import Any, ClassVar
 
-from pymodbus.constants import Endian
-from pymodbus.payload import BinaryPayloadBuilder, BinaryPayloadDecoder
+from clickplc.util import _COILS_PER_READ, _REGISTERS_PER_READ, AsyncioModbusClient
 
-from clickplc.util import AsyncioModbusClient
+# A single address (e.g. 'df1') or a range of addresses (e.g. 'df1-df20').
+_ADDRESS_RE = re.compile(r'^([a-z]+)(\d+)(?:-([a-z]+)(\d+))?$', re.IGNORECASE)
+
+# Python types accepted by `set` for each data type.
+_PYTHON_TYPES = {'bool': bool, 'float': float, 'int16': int, 'int32': int}
+
+# X and Y own the first 16 of every 32 coils, one 32-coil block per hundred.
+_XY_ADDRESSES = tuple(n for n in range(1, 817) if 0 < n % 100 <= 16)
+_XY_COILS = tuple(32 * (n // 100) + n % 100 - 1 for n in _XY_ADDRESSES)
+_XY_COIL_BY_ADDRESS = dict(zip(_XY_ADDRESSES, _XY_COILS))
+_XY_KEYS = {category: tuple(f'{category}{n:03}' for n in _XY_ADDRESSES)
+            for category in ('x', 'y')}
+
+# Result keys, formatted once at import rather than on every read.
+_C_KEYS = tuple(f'c{n}' for n in range(1, 2001))
+_T_KEYS = tuple(f't{n}' for n in range(1, 501))
+_CT_KEYS = tuple(f'ct{n}' for n in range(1, 251))
+_DS_KEYS = tuple(f'ds{n}' for n in range(1, 4501))
+_DD_KEYS = tuple(f'dd{n}' for n in range(1, 1001))
+_DF_KEYS = tuple(f'df{n}' for n in range(1, 501))
+_TD_KEYS = tuple(f'td{n}' for n in range(1, 501))
+_CTD_KEYS = tuple(f'ctd{n}' for n in range(1, 251))
+_SD_KEYS = tuple(f'sd{n}' for n in range(1, 4501))
+_KEYS = {'c': _C_KEYS, 't': _T_KEYS, 'ct': _CT_KEYS, 'ds': _DS_KEYS, 'dd': _DD_KEYS,
+         'df': _DF_KEYS, 'td': _TD_KEYS, 'ctd': _CTD_KEYS, 'sd': _SD_KEYS}
+
+# Registers per value for each `struct` format code in use.
+_REGISTERS_PER_VALUE = {'h': 1, 'i': 2, 'f': 2}
+
+# `struct` format code of each register data type.
+_STRUCT_CODES = {'int16': 'h', 'int32': 'i', 'float': 'f'}
+
+
+# Polling loops request the same few addresses and ranges over and over, so
+# the parsing and layout helpers below are cached rather than redone per call.
+
+
+@functools.lru_cache(maxsize=64)
+def _structs(code: str, count: int) -> tuple[struct.Struct, struct.Struct]:
+    """Return compiled (registers, values) layouts for `count` values of `code`."""
+    return (struct.Struct(f'<{count * _REGISTERS_PER_VALUE[code]}H'),
+            struct.Struct(f'<{count}{code}'))
+
+
+def _decode(registers: list[int], code: str) -> tuple:
+    """Decode registers into values of the given `struct` format code.
+
+    The ClickPLC stores big-endian words in little-endian word order, which
+    is plain little-endian data once each register is packed little-endian.
+    This decodes every value in one C-level pass.
+    """
+    words, values = _structs(code, len(registers) // _REGISTERS_PER_VALUE[code])
+    return values.unpack(words.pack(*registers))
+
+
+def _encode(values: list, code: str) -> list[bytes]:
+    """Encode values of the given `struct` format code into register payloads.
+
+    This is the inverse of `_decode`, packing every value in one pass and
+    returning one big-endian 2-byte payload per register.
+    """
+    words, layout = _structs(code, len(values))
+    return [word.to_bytes(2, 'big') for word in words.unpack(layout.pack(*values))]
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_address(address: str) -> tuple[str, int, str | None, int | None]:
+    """Split an address or range (e.g. 'DF1-DF40') into categories and indices."""
+    match = _ADDRESS_RE.match(address)
+    if match is None:
+        raise ValueError(f"Invalid address '{address}'.")
+    category, start, end_category, end = match.groups()
+    if end_category is None:
+        return category.lower(), int(start), None, None
+    return category.lower(), int(start), end_category.lower(), int(end)
+
+
+def _split_address(address: str) -> tuple[str, int]:
+    """Split a single address (e.g. 'DF1') into its category and index."""
+    category, index, end_category, _ = _parse_address(address)
+    if end_category is not None:
+        raise ValueError(f"Invalid address '{address}'.")
+    return category, index
+
+
+@functools.lru_cache(maxsize=64)
+def _xy_layout(category: str, start: int, end: int) -> tuple[tuple[str, ...], tuple[int, ...]]:
+    """Return the X/Y labels in a range and their coil offsets from its start."""
+    lo, hi = bisect_left(_XY_ADDRESSES, start), bisect_right(_XY_ADDRESSES, end)
+    start_coil = _XY_COILS[lo]
+    return (_XY_KEYS[category][lo:hi],
+            tuple(coil - start_coil for coil in _XY_COILS[lo:hi]))
+
+
+def _coalesce(category: str, spans: list[tuple[int, int]],
+              data_type: str) -> list[tuple[int, int]]:
+    """Merge (start, end) spans wherever reading through the gap costs no extra request.
+
+    Two spans are read as one when that takes no more Modbus requests than
+    reading them separately, so only gaps wider than a whole read are skipped.
+    """
+    position = _XY_COIL_BY_ADDRESS.__getitem__ if category in ('x', 'y') else int
+    if data_type == 'bool':
+        width, per_read = 1, _COILS_PER_READ
+    else:
+        width, per_read = _REGISTERS_PER_VALUE[_STRUCT_CODES[data_type]], _REGISTERS_PER_READ
+
+    def reads(start: int, end: int) -> int:
+        return -(-(position(end) - position(start) + 1) * width // per_read)
+
+    runs: list[tuple[int, int]] = []
+    for start, end in sorted(spans):
+        if runs:
+            run_start, run_end = runs[-1]
+            merged_end = max(run_end, end)
+            if reads(run_start, merged_end) <= reads(run_start, run_end) + reads(start, end):
+                runs[-1] = (run_start, merged_end)
+                continue
+        runs.append((start, end))
+    return runs
+
+
+def _range_keys(category: str, start: int, end: int) -> tuple[str, ...]:
+    """Return the result keys of the addresses from `start` to `end`."""
+    if category in ('x', 'y'):
+        return _xy_layout(category, start, end)[0]
+    return _KEYS[category][start - 1:end]
+
+
+def _xy_coil(address: int, name: str) -> int:
+    """Validate an X/Y address and return its coil offset within the category."""
+    coil = _XY_COIL_BY_ADDRESS.get(address)
+    if coil is not None:
+        return coil
+    if address % 100 == 0 or address % 100 > 16:
+        raise ValueError(f'{name} address must be *01-*16.')
+    raise ValueError(f'{name} address must be in [001, 816].')
 
 
 class ClickPLC(AsyncioModbusClient):
@@ -27,6 +167,8 @@ class ClickPLC(AsyncioModbusClient):
     abstracting corner cases and providing a simple asynchronous interface.
     """
 
+    __slots__ = ('_getters', '_setters', '_tag_keys', 'active_addresses', 'tags')
+
     data_types: ClassVar[dict] = {
         'x': 'bool',     # Input point
         'y': 'bool',     # Output point
@@ -41,18 +183,30 @@ class ClickPLC(AsyncioModbusClient):
         'sd': 'int16',   # (S)ystem (D)ata register, single
     }
 
-    def __init__(self, address, tag_filepath='', timeout=1):
+    def __init__(self, address, tag_filepath='', timeout=1, pipeline=False, cache_ttl=0):
         """Initialize PLC connection and data structure.
 
         Args:
             address: The PLC IP address or DNS name
             tag_filepath: Path to the PLC tags file
             timeout (optional): Timeout when communicating with PLC. Default 1s.
+            pipeline (optional): Allow concurrent requests to be in flight at
+                once instead of serializing them, for devices that accept
+                overlapping requests. Pass an int to set how many. Has no
+                effect with pymodbus 3.6+. Default False.
+            cache_ttl (optional): Seconds to reuse the result of a read for
+                identical reads, saving a round trip. Any write clears it.
+                Default 0 (disabled).
 
         """
-        super().__init__(address, timeout)
+        if pipeline and self.pymodbus36plus:
+            warnings.warn("pipeline has no effect with pymodbus 3.6+, which sends one "
+                          "request at a time itself.", stacklevel=2)
+        super().__init__(address, timeout, pipeline, cache_ttl)
         self.tags = self._load_tags(tag_filepath)
         self.active_addresses = self._get_address_ranges(self.tags)
+        self._tag_keys = self._get_tag_keys(self.tags)
+        self._getters, self._setters = self._get_dispatch_tables()
 
     def get_tags(self) -> dict:
         """Return all tags and associated configuration information.
@@ -93,28 +247,66 @@ class ClickPLC(AsyncioModbusClient):
             if not self.tags:
                 raise ValueError('An address must be supplied to get if tags were not '
                                  'provided when driver initialized')
-            results = {}
-            for category, _address in self.active_addresses.items():
-                results.update(await getattr(self, '_get_' + category)
-                                            (_address['min'], _address['max']))
-            return {tag_name: results[tag_info['id'].lower()]
-                    for tag_name, tag_info in self.tags.items()}
-
-        if '-' in address:
-            start, end = address.split('-')
-        else:
-            start, end = address, None
-        i = next(i for i, s in enumerate(start) if s.isdigit())
-        category, start_index = start[:i].lower(), int(start[i:])
-        end_index = None if end is None else int(end[i:])
-
+            results = await self._read_runs(
+                (category, start, end)
+                for category, _address in self.active_addresses.items()
+                for start, end in _address['runs']
+            )
+            return {tag_name: results[category][key]
+                    for tag_name, category, key in self._tag_keys}
+
+        category, start_index, end_index = self._parse_range(address)
+        return await self._getters[category](start_index, end_index)
+
+    async def get_many(self, addresses: list[str]) -> dict:
+        """Get several addresses or ranges from the ClickPLC at once.
+
+        The reads are issued together and their results merged into one dict.
+        >>> plc.get_many(['x001-x816', 'y001-y816', 'df1-df500'])
+        {'x001': False, ..., 'y816': False, 'df1': 0.0, ..., 'df500': 0.0}
+
+        Ranges within a category that overlap or nearly touch are read with a
+        single request, and only the requested addresses are returned.
+        """
+        requests = []
+        spans: dict[str, list[tuple[int, int]]] = defaultdict(list)
+        for address in addresses:
+            category, start, end = self._parse_range(address)
+            end = start if end is None else end
+            if category in ('x', 'y'):  # Interior addresses skip the getter's checks
+                _xy_coil(start, f'{category.upper()} start')
+                _xy_coil(end, f'{category.upper()} end')
+            requests.append((category, start, end))
+            spans[category].append((start, end))
+        results = await self._read_runs(
+            (category, start, end)
+            for category, category_spans in spans.items()
+            for start, end in _coalesce(category, category_spans, self.data_types[category])
+        )
+        return {key: results[category][key]
+                for category, start, end in requests
+                for key in _range_keys(category, start, end)}
+
+    def _parse_range(self, address: str) -> tuple[str, int, int | None]:
+        """Validate an address or range and return its category and indices."""
+        category, start_index, end_category, end_index = _parse_address(address)
         if end_index is not None and end_index < start_index:
             raise ValueError("End address must be greater than start address.")
         if category not in self.data_types:
             raise ValueError(f"{category} currently unsupported.")
-        if end is not None and end[:i].lower() != category:
+        if end_category is not None and end_category != category:
             raise ValueError("Inter-category ranges are unsupported.")
-        return await getattr(self, '_get_' + category)(start_index, end_index)
+        return category, start_index, end_index
+
+    async def _read_runs(self, runs) -> dict[str, dict]:
+        """Read (category, start, end) runs together and merge them per category."""
+        runs = list(runs)
+        results: dict[str, dict] = defaultdict(dict)
+        for (category, _, _), result in zip(runs, await asyncio.gather(*(
+            self._getters[category](start, end) for category, start, end in runs
+        ))):
+            results[category].update(result)
+        return results
 
     async def set(self, address: str, data):
         """Set values on the ClickPLC.
@@ -138,25 +330,25 @@ class ClickPLC(AsyncioModbusClient):
         if not isinstance(data, list):
             data = [data]
 
-        i = next(i for i, s in enumerate(address) if s.isdigit())
-        category, index = address[:i].lower(), int(address[i:])
+        category, index = _split_address(address)
         if category not in self.data_types:
             raise ValueError(f"{category} currently unsupported.")
-        data_type = self.data_types[category].rstrip(digits)
+        expected = _PYTHON_TYPES[self.data_types[category]]
         for datum in data:
-            if type(datum) == int and data_type == 'float':  # noqa: E721
-                datum = float(datum)
-            if type(datum) != pydoc.locate(data_type):
-                raise ValueError(f"Expected {address} as a {data_type}.")
-        return await getattr(self, '_set_' + category)(index, data)
-
-    async def _get_x(self, start: int, end: int) -> dict:
+            # Exact type checks, as bools are ints but are not accepted as them
+            if type(datum) is not expected and not (expected is float and type(datum) is int):
+                raise ValueError(f"Expected {address} as a {expected.__name__}.")
+        if category not in self._setters:
+            raise ValueError(f"{category} is read-only.")
+        return await self._setters[category](index, data)
+
+    async def _get_x(self, start: int, end: int) -> dict | bool:
         """Read X addresses. Called by `get`.
 
         X entries start at 0 (1 in the Click software's 1-indexed
         notation). This function also handles some of the quirks of the unit.
 
-        First, the modbus addresses aren't sequential. Instead, the pattern is:
+        The modbus addresses aren't sequential. Instead, the pattern is:
             X001 0
             [...]
             X016 15
@@ -165,49 +357,16 @@ class ClickPLC(AsyncioModbusClient):
         The X addressing only goes up to *16, then jumps 16 coils to get to
         the next hundred. Rather than the overhead of multiple requests, this
         is handled by reading all the data and throwing away unowned addresses.
-
-        Second, the response always returns a full byte of data. If you request
-        a number of addresses not divisible by 8, it will have extra data. The
-        extra data here is discarded before returning.
         """
-        if start % 100 == 0 or start % 100 > 16:
-            raise ValueError('X start address must be *01-*16.')
-        if start < 1 or start > 816:
-            raise ValueError('X start address must be in [001, 816].')
+        return await self._get_xy('x', 0, start, end)
 
-        start_coil = 32 * (start // 100) + start % 100 - 1
-        if end is None:
-            count = 1
-        else:
-            if end % 100 == 0 or end % 100 > 16:
-                raise ValueError('X end address must be *01-*16.')
-            if end < 1 or end > 816:
-                raise ValueError('X end address must be in [001, 816].')
-            end_coil = 32 * (end // 100) + end % 100 - 1
-            count = end_coil - start_coil + 1
-
-        coils = await self.read_coils(start_coil, count)
-        if count == 1:
-            return coils.bits[0]
-        output = {}
-        current = start
-        for bit in coils.bits:
-            if current > end:
-                break
-            elif current % 100 <= 16:
-                output[f'x{current:03}'] = bit
-            elif current % 100 == 32:
-                current += 100 - 32
-            current += 1
-        return output
-
-    async def _get_y(self, start: int, end: int) -> dict:
+    async def _get_y(self, start: int, end: int) -> dict | bool:
         """Read Y addresses. Called by `get`.
 
         Y entries start at 8192 (8193 in the Click software's 1-indexed
         notation). This function also handles some of the quirks of the unit.
 
-        First, the modbus addresses aren't sequential. Instead, the pattern is:
+        The modbus addresses aren't sequential. Instead, the pattern is:
             Y001 8192
             [...]
             Y016 8208
@@ -216,51 +375,31 @@ class ClickPLC(AsyncioModbusClient):
         The Y addressing only goes up to *16, then jumps 16 coils to get to
         the next hundred. Rather than the overhead of multiple requests, this
         is handled by reading all the data and throwing away unowned addresses.
+        """
+        return await self._get_xy('y', 8192, start, end)
+
+    async def _get_xy(self, category: str, base: int, start: int, end: int) -> dict | bool:
+        """Read X or Y addresses, whose coils start at `base`.
 
-        Second, the response always returns a full byte of data. If you request
-        a number of addresses not divisible by 8, it will have extra data. The
-        extra data here is discarded before returning.
+        The two categories share the same quirky layout and differ only in
+        their base coil. See `_get_x` for details.
         """
-        if start % 100 == 0 or start % 100 > 16:
-            raise ValueError('Y start address must be *01-*16.')
-        if start < 1 or start > 816:
-            raise ValueError('Y start address must be in [001, 816].')
+        name = category.upper()
+        start_coil = _xy_coil(start, f'{name} start')
+        end_coil = start_coil if end is None else _xy_coil(end, f'{name} end')
+        count = end_coil - start_coil + 1
 
-        start_coil = 8192 + 32 * (start // 100) + start % 100 - 1
+        coils = (await self.read_coils(base + start_coil, count)).bits
         if end is None:
-            count = 1
-        else:
-            if end % 100 == 0 or end % 100 > 16:
-                raise ValueError('Y end address must be *01-*16.')
-            if end < 1 or end > 816:
-                raise ValueError('Y end address must be in [001, 816].')
-            end_coil = 8192 + 32 * (end // 100) + end % 100 - 1
-            count = end_coil - start_coil + 1
-
-        coils = await self.read_coils(start_coil, count)
-        if count == 1:
-            return coils.bits[0]
-        output = {}
-        current = start
-        for bit in coils.bits:
-            if current > end:
-                break
-            elif current % 100 <= 16:
-                output[f'y{current:03}'] = bit
-            elif current % 100 == 32:
-                current += 100 - 32
-            current += 1
-        return output
+            return coils[0]
+        labels, offsets = _xy_layout(category, start, end)
+        return dict(zip(labels, map(coils.__getitem__, offsets)))
 
     async def _get_c(self, start: int, end: int) -> dict | bool:
         """Read C addresses. Called by `get`.
 
         C entries start at 16384 (16385 in the Click software's 1-indexed
         notation). This continues for 2000 bits, ending at 18383.
-
-        The response always returns a full byte of data. If you request
-        a number of addresses not divisible by 8, it will have extra data. The
-        extra data here is discarded before returning.
         """
         if start < 1 or start > 2000:
             raise ValueError('C start address must be 1-2000.')
@@ -269,52 +408,44 @@ class ClickPLC(AsyncioModbusClient):
         if end is None:
             count = 1
         else:
-            if end <= start or end > 2000:
-                raise ValueError('C end address must be >start and <=2000.')
+            if end < start or end > 2000:
+                raise ValueError('C end address must be >=start and <=2000.')
             end_coil = 16384 + end - 1
             count = end_coil - start_coil + 1
 
-        coils = await self.read_coils(start_coil, count)
-        if count == 1:
-            return coils.bits[0]
-        return {f'c{(start + i)}': bit for i, bit in enumerate(coils.bits) if i < count}
+        coils = (await self.read_coils(start_coil, count)).bits
+        if end is None:
+            return coils[0]
+        return dict(zip(_C_KEYS[start - 1:end], coils))
 
     async def _get_t(self, start: int, end: int) -> dict | bool:
         """Read T addresses.
 
         T entries start at 45056 (45057 in the Click software's 1-indexed
         notation). This continues for 500 bits, ending at 45555.
-
-        The response always returns a full byte of data. If you request
-        a number of addresses not divisible by 8, it will have extra data. The
-        extra data here is discarded before returning.
         """
         if start < 1 or start > 500:
             raise ValueError('T start address must be 1-500.')
 
-        start_coil = 45057 + start - 1
+        start_coil = 45056 + start - 1
         if end is None:
             count = 1
         else:
-            if end <= start or end > 500:
-                raise ValueError('T end address must be >start and <=500.')
-            end_coil = 14555 + end - 1
+            if end < start or end > 500:
+                raise ValueError('T end address must be >=start and <=500.')
+            end_coil = 45056 + end - 1
             count = end_coil - start_coil + 1
 
-        coils = await self.read_coils(start_coil, count)
-        if count == 1:
-            return coils.bits[0]
-        return {f't{(start + i)}': bit for i, bit in enumerate(coils.bits) if i < count}
+        coils = (await self.read_coils(start_coil, count)).bits
+        if end is None:
+            return coils[0]
+        return dict(zip(_T_KEYS[start - 1:end], coils))
 
     async def _get_ct(self, start: int, end: int) -> dict | bool:
         """Read CT addresses.
 
         CT entries start at 49152 (49153 in the Click software's 1-indexed
         notation). This continues for 250 bits, ending at 49402.
-
-        The response always returns a full byte of data. If you request
-        a number of addresses not divisible by 8, it will have extra data. The
-        extra data here is discarded before returning.
         """
         if start < 1 or start > 250:
             raise ValueError('CT start address must be 1-250.')
@@ -323,15 +454,15 @@ class ClickPLC(AsyncioModbusClient):
         if end is None:
             count = 1
         else:
-            if end <= start or end > 250:
-                raise ValueError('CT end address must be >start and <=250.')
-            end_coil = 49401 + end - 1
+            if end < start or end > 250:
+                raise ValueError('CT end address must be >=start and <=250.')
+            end_coil = 49152 + end - 1
             count = end_coil - start_coil + 1
 
-        coils = await self.read_coils(start_coil, count)
-        if count == 1:
-            return coils.bits[0]
-        return {f'ct{(start + i)}': bit for i, bit in enumerate(coils.bits) if i < count}
+        coils = (await self.read_coils(start_coil, count)).bits
+        if end is None:
+            return coils[0]
+        return dict(zip(_CT_KEYS[start - 1:end], coils))
 
     async def _get_ds(self, start: int, end: int) -> dict | int:
         """Read DS registers. Called by `get`.
@@ -346,15 +477,10 @@ class ClickPLC(AsyncioModbusClient):
 
         address = 0 + start - 1
         count = 1 if end is None else (end - start + 1)
-        registers = await self.read_registers(address, count)
-        bigendian = Endian.BIG if self.pymodbus35plus else Endian.Big  # type:ignore[attr-defined]
-        lilendian = Endian.LITTLE if self.pymodbus35plus else Endian.Little  # type:ignore
-        decoder = BinaryPayloadDecoder.fromRegisters(registers,
-                                                     byteorder=bigendian,
-                                                     wordorder=lilendian)
+        values = _decode(await self.read_registers(address, count), 'h')
         if end is None:
-            return decoder.decode_16bit_int()
-        return {f'ds{n}': decoder.decode_16bit_int() for n in range(start, end + 1)}
+            return values[0]
+        return dict(zip(_DS_KEYS[start - 1:end], values))
 
     async def _get_dd(self, start: int, end: int) -> dict | int:
         """Read DD registers.
@@ -369,15 +495,10 @@ class ClickPLC(AsyncioModbusClient):
 
         address = 16384 + 2 * (start - 1)  # 32-bit
         count = 2 if end is None else 2 * (end - start + 1)
-        registers = await self.read_registers(address, count)
-        bigendian = Endian.BIG if self.pymodbus35plus else Endian.Big  # type:ignore[attr-defined]
-        lilendian = Endian.LITTLE if self.pymodbus35plus else Endian.Little  # type:ignore
-        decoder = BinaryPayloadDecoder.fromRegisters(registers,
-                                                     byteorder=bigendian,
-                                                     wordorder=lilendian)
+        values = _decode(await self.read_registers(address, count), 'i')
         if end is None:
-            return decoder.decode_32bit_int()
-        return {f'dd{n}': decoder.decode_32bit_int() for n in range(start, end + 1)}
+            return values[0]
+        return dict(zip(_DD_KEYS[start - 1:end], values))
 
     async def _get_df(self, start: int, end: int) -> dict | float:
         """Read DF registers. Called by `get`.
@@ -393,15 +514,10 @@ class ClickPLC(AsyncioModbusClient):
 
         address = 28672 + 2 * (start - 1)
         count = 2 * (1 if end is None else (end - start + 1))
-        registers = await self.read_registers(address, count)
-        bigendian = Endian.BIG if self.pymodbus35plus else Endian.Big  # type:ignore[attr-defined]
-        lilendian = Endian.LITTLE if self.pymodbus35plus else Endian.Little  # type:ignore
-        decoder = BinaryPayloadDecoder.fromRegisters(registers,
-                                                     byteorder=bigendian,
-                                                     wordorder=lilendian)
+        values = _decode(await self.read_registers(address, count), 'f')
         if end is None:
-            return decoder.decode_32bit_float()
-        return {f'df{n}': decoder.decode_32bit_float() for n in range(start, end + 1)}
+            return values[0]
+        return dict(zip(_DF_KEYS[start - 1:end], values))
 
     async def _get_td(self, start: int, end: int) -> dict:
         """Read TD registers. Called by `get`.
@@ -416,15 +532,10 @@ class ClickPLC(AsyncioModbusClient):
 
         address = 45056 + (start - 1)
         count = 1 if end is None else (end - start + 1)
-        registers = await self.read_registers(address, count)
-        bigendian = Endian.BIG if self.pymodbus35plus else Endian.Big  # type:ignore[attr-defined]
-        lilendian = Endian.LITTLE if self.pymodbus35plus else Endian.Little  # type:ignore
-        decoder = BinaryPayloadDecoder.fromRegisters(registers,
-                                                     byteorder=bigendian,
-                                                     wordorder=lilendian)
+        values = _decode(await self.read_registers(address, count), 'h')
         if end is None:
-            return decoder.decode_16bit_int()
-        return {f'td{n}': decoder.decode_16bit_int() for n in range(start, end + 1)}
+            return values[0]
+        return dict(zip(_TD_KEYS[start - 1:end], values))
 
     async def _get_ctd(self, start: int, end: int) -> dict:
         """Read CTD registers. Called by `get`.
@@ -439,15 +550,10 @@ class ClickPLC(AsyncioModbusClient):
 
         address = 49152 + 2 * (start - 1)  # 32-bit
         count = 1 if end is None else (end - start + 1)
-        registers = await self.read_registers(address, count * 2)
-        bigendian = Endian.BIG if self.pymodbus35plus else Endian.Big  # type:ignore[attr-defined]
-        lilendian = Endian.LITTLE if self.pymodbus35plus else Endian.Little  # type:ignore
-        decoder = BinaryPayloadDecoder.fromRegisters(registers,
-                                                     byteorder=bigendian,
-                                                     wordorder=lilendian)
+        values = _decode(await self.read_registers(address, count * 2), 'i')
         if end is None:
-            return decoder.decode_32bit_int()
-        return {f'ctd{n}': decoder.decode_32bit_int() for n in range(start, end + 1)}
+            return values[0]
+        return dict(zip(_CTD_KEYS[start - 1:end], values))
 
     async def _get_sd(self, start: int, end: int) -> dict | int:
         """Read SD registers. Called by `get`.
@@ -462,41 +568,33 @@ class ClickPLC(AsyncioModbusClient):
 
         address = 61440 + start - 1
         count = 1 if end is None else (end - start + 1)
-        registers = await self.read_registers(address, count)
-        bigendian = Endian.BIG if self.pymodbus35plus else Endian.Big  # type:ignore[attr-defined]
-        lilendian = Endian.LITTLE if self.pymodbus35plus else Endian.Little  # type:ignore
-        decoder = BinaryPayloadDecoder.fromRegisters(registers,
-                                                     byteorder=bigendian,
-                                                     wordorder=lilendian)
+        values = _decode(await self.read_registers(address, count), 'h')
         if end is None:
-            return decoder.decode_16bit_int()
-        return {f'sd{n}': decoder.decode_16bit_int() for n in range(start, end + 1)}
+            return values[0]
+        return dict(zip(_SD_KEYS[start - 1:end], values))
 
     async def _set_y(self, start: int, data: list[bool] | bool):
         """Set Y addresses. Called by `set`.
 
         For more information on the quirks of Y coils, read the `_get_y`
-        docstring.
+        docstring. Lists spanning several hundreds are written with one
+        request per hundred so the unowned coils in between are untouched.
         """
-        if start % 100 == 0 or start % 100 > 16:
-            raise ValueError('Y start address must be *01-*16.')
-        if start < 1 or start > 816:
-            raise ValueError('Y start address must be in [001, 816].')
-        coil = 8192 + 32 * (start // 100) + start % 100 - 1
+        coil = 8192 + _xy_coil(start, 'Y start')
+        if isinstance(data, list) and len(data) == 1:
+            data = data[0]  # Write Single Coil is a smaller request
 
         if isinstance(data, list):
             if len(data) > 16 * (9 - start // 100) - start % 100 + 1:
                 raise ValueError('Data list longer than available addresses.')
-            payload = []
-            if (start % 100) + len(data) > 16:
-                i = 17 - (start % 100)
-                payload += data[:i] + [False] * 16
-                data = data[i:]
-            while len(data) > 16:
-                payload += data[:16] + [False] * 16
-                data = data[16:]
-            payload += data
-            await self.write_coils(coil, payload)
+            # Write each hundred's run of owned coils as its own request
+            # rather than padding over the 16 unowned coils between them.
+            writes = []
+            offset, size = 0, 17 - start % 100
+            while offset < len(data):
+                writes.append(self.write_coils(coil, data[offset:offset + size]))
+                coil, offset, size = coil + size + 16, offset + size, 16
+            await asyncio.gather(*writes)
         else:
             await self.write_coil(coil, data)
 
@@ -509,6 +607,8 @@ class ClickPLC(AsyncioModbusClient):
         if start < 1 or start > 2000:
             raise ValueError('C start address must be 1-2000.')
         coil = 16384 + start - 1
+        if isinstance(data, list) and len(data) == 1:
+            data = data[0]  # Write Single Coil is a smaller request
 
         if isinstance(data, list):
             if len(data) > (2000 - start + 1):
@@ -526,29 +626,19 @@ class ClickPLC(AsyncioModbusClient):
             Hex: 3dcc cccd (IEEE-754 float32)
             Click: -1.076056E8
             Hex: cccd 3dcc
-        To fix, we need to flip the registers. Implemented below in `pack`.
+        To fix, we need to flip the registers. Implemented in `_encode`.
         """
         if start < 1 or start > 500:
             raise ValueError('DF must be in [1, 500]')
         address = 28672 + 2 * (start - 1)
 
-        bigendian = Endian.BIG if self.pymodbus35plus else Endian.Big  # type:ignore[attr-defined]
-        lilendian = Endian.LITTLE if self.pymodbus35plus else Endian.Little  # type:ignore
-
-        def _pack(values: list[float]):
-            builder = BinaryPayloadBuilder(byteorder=bigendian,
-                                           wordorder=lilendian)
-            for value in values:
-                builder.add_32bit_float(float(value))
-            return builder.build()
-
         if isinstance(data, list):
             if len(data) > 500 - start + 1:
                 raise ValueError('Data list longer than available addresses.')
-            payload = _pack(data)
+            payload = _encode(data, 'f')
             await self.write_registers(address, payload, skip_encode=True)
         else:
-            await self.write_register(address, _pack([data]), skip_encode=True)
+            await self.write_register(address, _encode([data], 'f'), skip_encode=True)
 
     async def _set_ds(self, start: int, data: list[int] | int):
         """Set DS registers. Called by `set`.
@@ -559,23 +649,13 @@ class ClickPLC(AsyncioModbusClient):
             raise ValueError('DS must be in [1, 4500]')
         address = (start - 1)
 
-        bigendian = Endian.BIG if self.pymodbus35plus else Endian.Big  # type:ignore[attr-defined]
-        lilendian = Endian.LITTLE if self.pymodbus35plus else Endian.Little  # type:ignore
-
-        def _pack(values: list[int]):
-            builder = BinaryPayloadBuilder(byteorder=bigendian,
-                                           wordorder=lilendian)
-            for value in values:
-                builder.add_16bit_int(int(value))
-            return builder.build()
-
         if isinstance(data, list):
             if len(data) > 4500 - start + 1:
                 raise ValueError('Data list longer than available addresses.')
-            payload = _pack(data)
+            payload = _encode(data, 'h')
             await self.write_registers(address, payload, skip_encode=True)
         else:
-            await self.write_register(address, _pack([data]), skip_encode=True)
+            await self.write_register(address, _encode([data], 'h'), skip_encode=True)
 
     async def _set_dd(self, start: int, data: list[int] | int):
         """Set DD registers. Called by `set`.
@@ -586,23 +666,13 @@ class ClickPLC(AsyncioModbusClient):
             raise ValueError('DD must be in [1, 1000]')
         address = 16384 + 2 * (start - 1)
 
-        bigendian = Endian.BIG if self.pymodbus35plus else Endian.Big  # type:ignore[attr-defined]
-        lilendian = Endian.LITTLE if self.pymodbus35plus else Endian.Little  # type:ignore
-
-        def _pack(values: list[int]):
-            builder = BinaryPayloadBuilder(byteorder=bigendian,
-                                           wordorder=lilendian)
-            for value in values:
-                builder.add_32bit_int(int(value))
-            return builder.build()
-
         if isinstance(data, list):
             if len(data) > 1000 - start + 1:
                 raise ValueError('Data list longer than available addresses.')
-            payload = _pack(data)
+            payload = _encode(data, 'i')
             await self.write_registers(address, payload, skip_encode=True)
         else:
-            await self.write_register(address, _pack([data]), skip_encode=True)
+            await self.write_register(address, _encode([data], 'i'), skip_encode=True)
 
     async def _set_td(self, start: int, data: list[int] | int):
         """Set TD registers. Called by `set`.
@@ -613,23 +683,13 @@ class ClickPLC(AsyncioModbusClient):
             raise ValueError('TD must be in [1, 500]')
         address = 45056 + (start - 1)
 
-        bigendian = Endian.BIG if self.pymodbus35plus else Endian.Big  # type:ignore[attr-defined]
-        lilendian = Endian.LITTLE if self.pymodbus35plus else Endian.Little  # type:ignore
-
-        def _pack(values: list[int]):
-            builder = BinaryPayloadBuilder(byteorder=bigendian,
-                                           wordorder=lilendian)
-            for value in values:
-                builder.add_16bit_int(int(value))
-            return builder.build()
-
         if isinstance(data, list):
             if len(data) > 500 - start + 1:
                 raise ValueError('Data list longer than available addresses.')
-            payload = _pack(data)
+            payload = _encode(data, 'h')
             await self.write_registers(address, payload, skip_encode=True)
         else:
-            await self.write_register(address, _pack([data]), skip_encode=True)
+            await self.write_register(address, _encode([data], 'h'), skip_encode=True)
 
     def _load_tags(self, tag_filepath: str) -> dict:
         """Load tags from file path.
@@ -637,49 +697,83 @@ class ClickPLC(AsyncioModbusClient):
         This tag file is optional but is needed to identify the appropriate variable names,
         and modbus addresses for tags in use on the PLC.
 
+        Parsed files are cached on their path and modification time, so
+        re-instantiating the driver with an unchanged file skips the parse.
+        The per-tag entries are shared between instances and not modified.
         """
         if not tag_filepath:
             return {}
+        return dict(self._parse_tags(tag_filepath, os.stat(tag_filepath).st_mtime_ns))
+
+    @classmethod
+    @functools.lru_cache(maxsize=8)
+    def _parse_tags(cls, tag_filepath: str, mtime_ns: int) -> dict:
+        """Parse a tags file. Called by `_load_tags`, which keys the cache on `mtime_ns`."""
         with open(tag_filepath) as csv_file:
             csv_data = csv_file.read().splitlines()
         csv_data[0] = csv_data[0].lstrip('## ')
-        parsed: dict[str, dict[str, Any]] = {
-            row['Nickname']: {
-                'address': {
-                    'start': int(row['Modbus Address']),
-                },
-                'id': row['Address'],
-                'comment': row['Address Comment'],
-                'type': self.data_types.get(
-                    row['Address'].rstrip(digits).lower()
-                ),
-            }
-            for row in csv.DictReader(csv_data)
-            if row['Nickname'] and not row['Nickname'].startswith("_")
+        parsed: dict[str, dict[str, Any]] = {}
+        for row in csv.DictReader(csv_data):
+            if row['Nickname'] and not row['Nickname'].startswith("_"):
+                parsed[row['Nickname']] = cls._parse_row(row)
+        return parsed
+
+    @classmethod
+    def _parse_row(cls, row: dict[str, str]) -> dict[str, Any]:
+        """Convert one row of a tags file into its tag info."""
+        data_type = cls.data_types.get(_split_address(row['Address'])[0])
+        if not data_type:
+            raise TypeError(
+                f"{row['Address']} is an unsupported data type. Open a "
+                "github issue at numat/clickplc to get it added."
+            )
+        tag_info: dict[str, Any] = {
+            'address': {'start': int(row['Modbus Address'])},
+            'id': row['Address'],
+            'type': data_type,
         }
-        for data in parsed.values():
-            if not data['comment']:
-                del data['comment']
-            if not data['type']:
-                raise TypeError(
-                    f"{data['id']} is an unsupported data type. Open a "
-                    "github issue at numat/clickplc to get it added."
-                )
-        sorted_tags = {k: parsed[k] for k in
-                       sorted(parsed, key=lambda k: parsed[k]['address']['start'])}
-        return sorted_tags
+        if row['Address Comment']:
+            tag_info['comment'] = row['Address Comment']
+        return tag_info
+
+    def _get_dispatch_tables(self) -> tuple[dict, dict]:
+        """Bind the per-category `_get_*` and `_set_*` methods once.
+
+        This saves building the method name and looking it up on every
+        `get` and `set` call.
+        """
+        getters = {category: getattr(self, '_get_' + category)
+                   for category in self.data_types}
+        setters = {category: getattr(self, '_set_' + category)
+                   for category in self.data_types if hasattr(self, '_set_' + category)}
+        return getters, setters
 
     @staticmethod
-    def _get_address_ranges(tags: dict) -> dict[str, dict]:
+    def _get_tag_keys(tags: dict) -> tuple[tuple[str, str, str], ...]:
+        """Pair each tag name with the category and key its value is read back under.
+
+        This is resolved once so `get` does not rebuild the keys every poll,
+        and can pick values out of each category's result without merging.
+        """
+        return tuple((tag_name, _split_address(tag_info['id'])[0], tag_info['id'].lower())
+                     for tag_name, tag_info in tags.items())
+
+    @classmethod
+    def _get_address_ranges(cls, tags: dict) -> dict[str, dict]:
         """Determine range of addresses required.
 
         Parse the loaded tags to determine the range of addresses that must be
-        queried to return all values
+        queried to return all values. Sparse tags are split into `runs` of
+        nearby addresses, so that large unused stretches are not read.
         """
-        address_dict: dict = defaultdict(lambda: {'min': 1, 'max': 1})
+        indices: dict[str, list[int]] = defaultdict(list)
         for tag_info in tags.values():
-            i = next(i for i, s in enumerate(tag_info['id']) if s.isdigit())
-            category, index = tag_info['id'][:i].lower(), int(tag_info['id'][i:])
-            address_dict[category]['min'] = min(address_dict[category]['min'], index)
-            address_dict[category]['max'] = max(address_dict[category]['max'], index)
-        return address_dict
+            category, index = _split_address(tag_info['id'])
+            indices[category].append(index)
+
+        ranges = {}
+        for category, values in indices.items():
+            runs = _coalesce(category, [(index, index) for index in values],
+                             cls.data_types[category])
+            ranges[category] = {'min': runs[0][0], 'max': runs[-1][1], 'runs': runs}
+        return ranges
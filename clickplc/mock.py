@@ -6,10 +6,10 @@ Uses local storage instead of remote communications.
 Distributed under the GNU General Public License v2
 Copyright (C) 2021 NuMat Technologies
 """
+import struct
 from collections import defaultdict
 from unittest.mock import MagicMock
 
-from pymodbus.bit_read_message import ReadCoilsResponse, ReadDiscreteInputsResponse
 from pymodbus.bit_write_message import WriteMultipleCoilsResponse, WriteSingleCoilResponse
 from pymodbus.register_read_message import ReadHoldingRegistersResponse
 from pymodbus.register_write_message import WriteMultipleRegistersResponse
@@ -24,37 +24,52 @@ class AsyncClientMock(MagicMock):
         """Convert regular mocks into into an async coroutine."""
         return super().__call__(*args, **kwargs)
 
-    def stop(self) -> None:
-        """Close the connection (2.5.3)."""
-        ...
+class _BitsResponse:
+    """Stand-in for pymodbus bit read responses, which the driver only reads `bits` from."""
+
+    __slots__ = ('bits',)
+
+    def __init__(self, bits):
+        self.bits = bits
 
 class ClickPLC(realClickPLC):
     """A version of the driver replacing remote communication with local storage for testing."""
 
-    def __init__(self, address, tag_filepath='', timeout=1):
+    def __init__(self, address, tag_filepath='', timeout=1, pipeline=False, cache_ttl=0):
         self.tags = self._load_tags(tag_filepath)
         self.active_addresses = self._get_address_ranges(self.tags)
+        self._tag_keys = self._get_tag_keys(self.tags)
+        self._getters, self._setters = self._get_dispatch_tables()
         self.client = AsyncClientMock()
+        self.cache_ttl = cache_ttl
+        self._cache = {}
+        self._generation = 0
+        self._closed = False
         self._coils = defaultdict(bool)
         self._discrete_inputs = defaultdict(bool)
-        self._registers = defaultdict(bytes)
-        self._detect_pymodbus_version()
-        if self.pymodbus33plus:
-            self.client.close = lambda: None
+        self._registers = bytearray(2 * 65536)  # The full 16-bit register space
+
+    async def __aenter__(self):
+        """Enter the context manager; there is no connection to wait for."""
+        return self
+
+    async def _close(self):
+        """Close the mock; there is no connection to close."""
+        self._closed = True
 
     async def _request(self, method, *args, **kwargs):
         if method == 'read_coils':
             address, count = args
-            return ReadCoilsResponse([self._coils[address + i] for i in range(count)])
+            return _BitsResponse([self._coils.get(a, False)
+                                  for a in range(address, address + count)])
         if method == 'read_discrete_inputs':
             address, count = args
-            return ReadDiscreteInputsResponse([self._discrete_inputs[address + i]
-                                               for i in range(count)])
+            return _BitsResponse([self._discrete_inputs.get(a, False)
+                                  for a in range(address, address + count)])
         elif method == 'read_holding_registers':
             address, count = args
-            return ReadHoldingRegistersResponse([int.from_bytes(self._registers[address + i],
-                                                                byteorder='big')
-                                                 for i in range(count)])
+            return ReadHoldingRegistersResponse(list(struct.unpack(
+                f'>{count}H', self._registers[2 * address:2 * (address + count)])))
         elif method == 'write_coil':
             address, data = args
             self._coils[address] = data
@@ -66,7 +81,6 @@ class ClickPLC(realClickPLC):
             return WriteMultipleCoilsResponse(address, data)
         elif method == 'write_registers':
             address, data = args
-            for i, d in enumerate(data):
-                self._registers[address + i] = d
+            self._registers[2 * address:2 * (address + len(data))] = b''.join(data)
             return WriteMultipleRegistersResponse(address, data)
         return NotImplementedError(f'Unrecognised method: {method}')
@@ -0,0 +1,95 @@
+"""A pool of connections to one ClickPLC.
+
+Distributed under the GNU General Public License v2
+Copyright (C) 2024 NuMat Technologies
+"""
+from __future__ import annotations
+
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+
+from clickplc.driver import ClickPLC
+
+
+class ClickPLCPool:
+    """Share several connections to one ClickPLC between concurrent callers.
+
+    Each connection serializes its own requests, so independent callers
+    otherwise queue behind one another. The pool lends every request a free
+    connection, letting up to `size` requests run at once. ClickPLCs accept a
+    handful of simultaneous Modbus connections, but requests on separate
+    connections reach the PLC at the same time and some firmware drops
+    overlapping requests. Lower `size` if requests start timing out.
+    """
+
+    def __init__(self, address, tag_filepath='', timeout=1, *, size=3, pipeline=False,
+                 cache_ttl=0):
+        """Open `size` connections to the PLC.
+
+        Args:
+            address: The PLC IP address or DNS name
+            tag_filepath: Path to the PLC tags file
+            timeout (optional): Timeout when communicating with PLC. Default 1s.
+            size (optional): Number of connections to open. Default 3.
+            pipeline (optional): Passed to each connection. See `ClickPLC`.
+            cache_ttl (optional): Passed to each connection. See `ClickPLC`.
+                A `set` through the pool clears every connection's cache.
+        """
+        self._clients = [ClickPLC(address, tag_filepath, timeout, pipeline, cache_ttl)
+                         for _ in range(size)]
+        self._idle: asyncio.Queue[ClickPLC] = asyncio.Queue()
+        for client in self._clients:
+            self._idle.put_nowait(client)
+
+    async def __aenter__(self):
+        """Asynchronously connect with the context manager."""
+        results = await asyncio.gather(*(client.__aenter__() for client in self._clients),
+                                       return_exceptions=True)
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:  # Don't leak the connections that did open
+            await self.__aexit__(None, None, None)
+            raise errors[0]
+        return self
+
+    async def __aexit__(self, *args) -> None:
+        """Provide exit to the context manager."""
+        await asyncio.gather(*(client.__aexit__(*args) for client in self._clients))
+
+    @asynccontextmanager
+    async def acquire(self) -> AsyncIterator[ClickPLC]:
+        """Borrow a connection, waiting for one to be free."""
+        client = await self._idle.get()
+        try:
+            yield client
+        finally:
+            self._idle.put_nowait(client)
+
+    def get_tags(self) -> dict:
+        """Return all tags and associated configuration information."""
+        return self._clients[0].get_tags()
+
+    async def get(self, address: str | None = None) -> dict:
+        """Get variables from the ClickPLC. See `ClickPLC.get`."""
+        async with self.acquire() as client:
+            return await client.get(address)
+
+    async def get_many(self, addresses: list[str]) -> dict:
+        """Get several addresses or ranges at once. See `ClickPLC.get_many`."""
+        async with self.acquire() as client:
+            return await client.get_many(addresses)
+
+    async def set(self, address: str, data):
+        """Set values on the ClickPLC. See `ClickPLC.set`."""
+        self._invalidate()
+        try:
+            async with self.acquire() as client:
+                return await client.set(address, data)
+        finally:
+            self._invalidate()
+
+    def _invalidate(self) -> None:
+        """Discard cached reads on every connection, as `ClickPLC` does on writes."""
+        for client in self._clients:
+            client._generation += 1
+            client._cache.clear()
@@ -1,9 +1,10 @@
 """Test the driver correctly parses a tags file and responds with correct data."""
+import asyncio
 from unittest import mock
 
 import pytest
 
-from clickplc import command_line
+from clickplc import ClickPLCPool, command_line
 from clickplc.mock import ClickPLC
 
 ADDRESS = 'fakeip'
@@ -76,6 +77,79 @@ async def test_tagged_driver(expected_tags):
         assert state.get('VAH_101_OK')
         assert expected_tags == tagged_driver.get_tags()
 
+@pytest.mark.asyncio(scope='session')
+async def test_read_cache():
+    """Confirm repeated reads are served from the cache until a write."""
+    async with ClickPLC(ADDRESS, cache_ttl=60) as plc:
+        with mock.patch.object(plc, '_request', wraps=plc._request) as request:
+            assert await plc.get('df1-df2') == {'df1': 0.0, 'df2': 0.0}
+            assert await plc.get('df1-df2') == {'df1': 0.0, 'df2': 0.0}
+            assert request.call_count == 1
+            await plc.set('df1', 1.0)
+            assert await plc.get('df1-df2') == {'df1': 1.0, 'df2': 0.0}
+            assert request.call_count == 3
+        # A read overlapping a write must not cache the value from before it
+        await asyncio.gather(plc.get('ds1'), plc.set('ds1', 5))
+        assert await plc.get('ds1') == 5
+
+@mock.patch('clickplc.pool.ClickPLC', ClickPLC)
+@pytest.mark.asyncio(scope='session')
+async def test_pool():
+    """Confirm the pool lends out separate connections and forwards requests."""
+    async with ClickPLCPool(ADDRESS, 'clickplc/tests/plc_tags.csv', size=2) as pool:
+        async with pool.acquire() as first, pool.acquire() as second:
+            assert first is not second
+        assert await pool.get('df1-df2') == {'df1': 0.0, 'df2': 0.0}
+        assert 'P_101' in await pool.get()
+        assert 'P_101' in pool.get_tags()
+    async with ClickPLCPool(ADDRESS, 'clickplc/tests/plc_tags.csv', size=2,
+                            cache_ttl=60) as pool:
+        await pool.get('ds1')
+        assert any(client._cache for client in pool._clients)
+        await pool.set('ds1', 5)  # Clears the cache of every connection
+        assert not any(client._cache for client in pool._clients)
+
+@mock.patch('clickplc.pool.ClickPLC', ClickPLC)
+@pytest.mark.asyncio(scope='session')
+async def test_pool_connect_failure():
+    """Confirm a pool that fails to connect closes the connections it opened."""
+    pool = ClickPLCPool(ADDRESS, 'clickplc/tests/plc_tags.csv', size=2)
+    failing, opened = pool._clients
+
+    async def enter(plc):
+        if plc is failing:
+            raise OSError('unreachable')
+        return plc
+
+    with mock.patch.object(ClickPLC, '__aenter__', enter), \
+            pytest.raises(OSError, match='unreachable'):
+        await pool.__aenter__()
+    assert opened._closed
+
+@pytest.mark.asyncio(scope='session')
+async def test_sparse_tags_requests(tmp_path):
+    """Confirm sparse tags are read in as few requests as one span of them."""
+    tags_file = tmp_path / 'sparse_tags.csv'
+    tags_file.write_text(
+        'Address,Data Type,Modbus Address,Function Code,Nickname,Initial Value,'
+        'Retentive,Address Comment\n' + ''.join(
+            f'DS{n},INT,{400000 + n},"FC=03","tag{n}",0,No,""\n' for n in range(1, 4500, 10)
+        ))
+    async with ClickPLC(ADDRESS, str(tags_file)) as plc:
+        with mock.patch.object(plc, '_request', wraps=plc._request) as request:
+            assert len(await plc.get()) == 450
+        assert request.call_count == 37  # ceil(4491 registers / 124)
+
+def test_address_ranges():
+    """Confirm the tagged address ranges span exactly the tagged addresses."""
+    tagged_driver = ClickPLC(ADDRESS, 'clickplc/tests/plc_tags.csv')
+    assert tagged_driver.active_addresses['y'] == {'min': 301, 'max': 302,
+                                                   'runs': [(301, 302)]}
+    assert tagged_driver.active_addresses['ds'] == {'min': 100, 'max': 100,
+                                                    'runs': [(100, 100)]}
+    assert tagged_driver.active_addresses['df'] == {'min': 1, 'max': 7,
+                                                    'runs': [(1, 7)]}
+
 @pytest.mark.asyncio(scope='session')
 async def test_y_roundtrip(plc_driver):
     """Confirm y (output bools) are read back correctly after being set."""
@@ -84,6 +158,9 @@ async def test_y_roundtrip(plc_driver):
     assert expected == await plc_driver.get('y1-y4')
     await plc_driver.set('y816', True)
     assert await plc_driver.get('y816') is True
+    await plc_driver.set('y115', [True, False, True])
+    expected = {'y115': True, 'y116': False, 'y201': True}
+    assert expected == await plc_driver.get('y115-y201')
 
 @pytest.mark.asyncio(scope='session')
 async def test_c_roundtrip(plc_driver):
@@ -94,6 +171,7 @@ async def test_c_roundtrip(plc_driver):
     assert expected == await plc_driver.get('c1-c5')
     await plc_driver.set('c2000', True)
     assert await plc_driver.get('c2000') is True
+    assert await plc_driver.get('c2000-c2000') == {'c2000': True}
 
 @pytest.mark.asyncio(scope='session')
 async def test_ds_roundtrip(plc_driver):
@@ -115,6 +193,17 @@ async def test_df_roundtrip(plc_driver):
     await plc_driver.set('df500', 1.0)
     assert await plc_driver.get('df500') == 1.0
 
+@pytest.mark.asyncio(scope='session')
+async def test_df_bulk_roundtrip(plc_driver):
+    """Confirm writes longer than one request are chunked correctly."""
+    values = [float(n) for n in range(200, 400)]
+    with mock.patch.object(plc_driver, '_request', wraps=plc_driver._request) as request:
+        await plc_driver.set('df200', values)
+    assert [(c.args[1], len(c.args[2])) for c in request.call_args_list] == [
+        (29070, 122), (29192, 122), (29314, 122), (29436, 34),
+    ]
+    assert list((await plc_driver.get('df200-df399')).values()) == values
+
 @pytest.mark.asyncio(scope='session')
 async def test_td_roundtrip(plc_driver):
     """Confirm td ints are read back correctly after being set."""
@@ -135,6 +224,37 @@ async def test_dd_roundtrip(plc_driver):
     await plc_driver.set('dd1000', 1000)
     assert await plc_driver.get('dd1000') == 1000
 
+@pytest.mark.asyncio(scope='session')
+@pytest.mark.parametrize(('address', 'coil'), [('y101', 8224), ('c5', 16388)])
+async def test_single_coil_write(plc_driver, address, coil):
+    """Confirm setting one coil uses a single-coil write."""
+    with mock.patch.object(plc_driver, '_request', wraps=plc_driver._request) as request:
+        await plc_driver.set(address, True)
+    request.assert_called_once_with('write_coil', coil, True)
+    assert await plc_driver.get(address) is True
+
+@pytest.mark.asyncio(scope='session')
+async def test_get_many(plc_driver):
+    """Confirm several addresses and ranges are read and merged into one dict."""
+    await plc_driver.set('df400', [1.0, 2.0])
+    await plc_driver.set('y801', True)
+    await plc_driver.set('ds4000', 3)
+    assert await plc_driver.get_many(['df400-df401', 'y801', 'ds4000']) == {
+        'df400': 1.0, 'df401': 2.0, 'y801': True, 'ds4000': 3,
+    }
+    with mock.patch.object(plc_driver, '_request', wraps=plc_driver._request) as request:
+        result = await plc_driver.get_many(['df401', 'df403-df404', 'df398-df400'])
+    request.assert_called_once_with('read_holding_registers', 28672 + 2 * 397, 14)
+    assert list(result) == ['df401', 'df403', 'df404', 'df398', 'df399', 'df400']
+
+@pytest.mark.asyncio(scope='session')
+@pytest.mark.parametrize(('prefix', 'last'), [('t', 500), ('ct', 250)])
+async def test_t_ct_get(plc_driver, prefix, last):
+    """Confirm read-only t and ct bools are read across their full range."""
+    expected = {f'{prefix}{n}': False for n in range(1, last + 1)}
+    assert expected == await plc_driver.get(f'{prefix}1-{prefix}{last}')
+    assert await plc_driver.get(f'{prefix}{last}') is False
+
 @pytest.mark.asyncio(scope='session')
 async def test_get_error_handling(plc_driver):
     """Confirm the driver gives an error on invalid get() calls."""
@@ -146,12 +266,18 @@ async def test_get_error_handling(plc_driver):
         await plc_driver.get('foo1')
     with pytest.raises(ValueError, match='Inter-category ranges are unsupported'):
         await plc_driver.get('c1-x3')
+    with pytest.raises(ValueError, match='Invalid address'):
+        await plc_driver.get('df')
 
 @pytest.mark.asyncio(scope='session')
 async def test_set_error_handling(plc_driver):
     """Confirm the driver gives an error on invalid set() calls."""
     with pytest.raises(ValueError, match='foo currently unsupported'):
         await plc_driver.set('foo1', 1)
+    with pytest.raises(ValueError, match='Invalid address'):
+        await plc_driver.set('df1-df2', 1.0)
+    with pytest.raises(ValueError, match='x is read-only'):
+        await plc_driver.set('x1', True)
 
 @pytest.mark.asyncio(scope='session')
 @pytest.mark.parametrize('prefix', ['x', 'y'])
@@ -181,7 +307,7 @@ async def test_c_error_handling(plc_driver):
     """Ensure errors are handled for invalid requests of c registers."""
     with pytest.raises(ValueError, match=r'C start address must be 1-2000.'):
         await plc_driver.get('c2001')
-    with pytest.raises(ValueError, match=r'C end address must be >start and <=2000.'):
+    with pytest.raises(ValueError, match=r'C end address must be >=start and <=2000.'):
         await plc_driver.get('c1-c2001')
     with pytest.raises(ValueError, match=r'C start address must be 1-2000.'):
         await plc_driver.set('c2001', True)
@@ -193,7 +319,7 @@ async def test_t_error_handling(plc_driver):
     """Ensure errors are handled for invalid requests of t registers."""
     with pytest.raises(ValueError, match=r'T start address must be 1-500.'):
         await plc_driver.get('t501')
-    with pytest.raises(ValueError, match=r'T end address must be >start and <=500.'):
+    with pytest.raises(ValueError, match=r'T end address must be >=start and <=500.'):
         await plc_driver.get('t1-t501')
 
 @pytest.mark.asyncio(scope='session')
@@ -201,7 +327,7 @@ async def test_ct_error_handling(plc_driver):
     """Ensure errors are handled for invalid requests of ct registers."""
     with pytest.raises(ValueError, match=r'CT start address must be 1-250.'):
         await plc_driver.get('ct251')
-    with pytest.raises(ValueError, match=r'CT end address must be >start and <=250.'):
+    with pytest.raises(ValueError, match=r'CT end address must be >=start and <=250.'):
         await plc_driver.get('ct1-ct251')
 
 
@@ -6,6 +6,12 @@ Copyright (C) 2022 NuMat Technologies
 from __future__ import annotations
 
 import asyncio
+import contextlib
+import functools
+import socket
+import time
+from itertools import chain
+from typing import Any, ClassVar
 
 try:
     from pymodbus.client import AsyncModbusTcpClient  # 3.x
@@ -15,6 +21,26 @@ except ImportError:  # 2.4.x - 2.5.x
     )
 import pymodbus.exceptions
 
+# The installed pymodbus (major, minor), parsed once at import.
+_PYMODBUS_VERSION = tuple(int(part) for part in pymodbus.__version__.split('.')[:2])
+
+# pymodbus client methods that requests are dispatched to.
+_MODBUS_METHODS = ('read_coils', 'read_discrete_inputs', 'read_holding_registers',
+                   'write_coil', 'write_coils', 'write_register', 'write_registers')
+
+# Keepalive probe after 10s idle, every 3s, giving up after 3 missed probes.
+_KEEPALIVE_OPTIONS = (('TCP_KEEPIDLE', 10), ('TCP_KEEPINTVL', 3), ('TCP_KEEPCNT', 3))
+
+# Most registers or coils one Modbus read returns.
+_REGISTERS_PER_READ = 124
+_COILS_PER_READ = 2000
+
+# Distinct reads held by the optional read cache before it is flushed.
+_CACHE_SIZE = 256
+
+# Requests in flight at once with `pipeline=True`, for devices that accept overlap.
+_PIPELINE_DEPTH = 3
+
 
 class AsyncioModbusClient:
     """A generic asyncio client.
@@ -23,33 +49,58 @@ class AsyncioModbusClient:
     including standard timeouts, async context manager, and queued requests.
     """
 
-    def __init__(self, address, timeout=1):
+    __slots__ = ('_cache', '_closed', '_generation', '_methods', 'cache_ttl', 'client',
+                 'connectTask', 'ip', 'lock', 'pipeline', 'timeout')
+
+    pymodbus30plus: ClassVar[bool] = _PYMODBUS_VERSION >= (3, 0)
+    pymodbus32plus: ClassVar[bool] = _PYMODBUS_VERSION >= (3, 2)
+    pymodbus33plus: ClassVar[bool] = _PYMODBUS_VERSION >= (3, 3)
+    pymodbus35plus: ClassVar[bool] = _PYMODBUS_VERSION >= (3, 5)
+    pymodbus36plus: ClassVar[bool] = _PYMODBUS_VERSION >= (3, 6)
+
+    def __init__(self, address, timeout=1, pipeline=False, cache_ttl=0):
         """Set up communication parameters."""
         self.ip = address
         self.timeout = timeout
-        self._detect_pymodbus_version()
+        self.pipeline = pipeline
+        self.cache_ttl = cache_ttl
+        self._cache: dict[tuple, tuple[float, Any]] = {}
+        self._generation = 0  # Bumped by writes, to discard reads that overlap them
+        self._closed = False
         if self.pymodbus30plus:
             self.client = AsyncModbusTcpClient(address, timeout=timeout)
         else:  # 2.x
             self.client = ReconnectingAsyncioModbusTcpClient()
-        self.lock = asyncio.Lock()
+        # Bind the request methods once. Before 3.2 they live on a protocol
+        # that is replaced on reconnect, so are looked up per request instead.
+        self._methods = ({method: getattr(self.client, method) for method in _MODBUS_METHODS}
+                         if self.pymodbus32plus else None)
+        self._hook_reconnects()
+        if pipeline:
+            depth = _PIPELINE_DEPTH if pipeline is True else pipeline
+            self.lock: asyncio.Lock | asyncio.Semaphore = asyncio.Semaphore(depth)
+        else:
+            self.lock = asyncio.Lock()
         self.connectTask = asyncio.create_task(self._connect())
 
     async def __aenter__(self):
-        """Asynchronously connect with the context manager."""
+        """Asynchronously connect with the context manager.
+
+        Waiting for the connection here surfaces connection errors on entry,
+        rather than on the first request. `__aexit__` is skipped when this
+        raises, so the client is closed here to stop pymodbus reconnecting.
+        """
+        try:
+            await self.connectTask
+        except Exception:
+            await self._close()
+            raise
         return self
 
     async def __aexit__(self, *args) -> None:
         """Provide exit to the context manager."""
         await self._close()
 
-    def _detect_pymodbus_version(self) -> None:
-        """Detect various pymodbus versions."""
-        self.pymodbus30plus = int(pymodbus.__version__[0]) == 3
-        self.pymodbus32plus = self.pymodbus30plus and int(pymodbus.__version__[2]) >= 2
-        self.pymodbus33plus = self.pymodbus30plus and int(pymodbus.__version__[2]) >= 3
-        self.pymodbus35plus = self.pymodbus30plus and int(pymodbus.__version__[2]) >= 5
-
     async def _connect(self) -> None:
         """Start asynchronous reconnect loop."""
         try:
@@ -58,80 +109,212 @@ class AsyncioModbusClient:
             else:  # 2.4.x - 2.5.x
                 await self.client.start(self.ip)  # type: ignore
         except Exception:
+            transport = None
+        else:
+            # A failed connect() returns None (3.0 - 3.2), (None, None) (3.3) or
+            # False (3.4+), so check for an open transport instead.
+            transport = self._transport()
+        if transport is None:
             raise OSError(f"Could not connect to '{self.ip}'.")
+        self._configure_socket()
+
+    def _hook_reconnects(self) -> None:
+        """Reapply `_configure_socket` whenever pymodbus opens a new connection.
+
+        pymodbus reconnects on its own after a dropped connection, and the new
+        socket would otherwise keep the default options. Each pymodbus release
+        line names the callback that announces a connection differently.
+        """
+        for name in ('callback_connected',  # 3.4+
+                     'cb_connection_made',  # 3.3.x, bound by the transport
+                     'client_made_connection',  # 3.2.x
+                     'protocol_made_connection'):  # 2.x, 3.0.x - 3.1.x
+            connected = getattr(self.client, name, None)
+            if connected is not None:
+                break
+        else:
+            return
+
+        @functools.wraps(connected)
+        def configured(*args, **kwargs):
+            result = connected(*args, **kwargs)
+            self._configure_socket()
+            return result
+        setattr(self.client, name, configured)
+
+    def _transport(self):
+        """Return the transport of the open connection, or None if there is none."""
+        transport = getattr(self.client, 'transport', None)  # 3.2+
+        if transport is None:  # 2.x, 3.0.x - 3.1.x
+            transport = getattr(getattr(self.client, 'protocol', None), 'transport', None)
+        return transport
+
+    def _configure_socket(self) -> None:
+        """Tune the connected socket for long-lived polling.
+
+        TCP keepalive lets the OS detect a silently dropped connection
+        instead of the next request waiting out the full timeout. Where the
+        platform allows, it probes after 10s idle rather than the default two
+        hours. Nagle's algorithm is disabled so small Modbus frames are sent
+        immediately.
+        """
+        transport = self._transport()
+        sock = transport.get_extra_info('socket') if transport is not None else None
+        if sock is None:
+            return
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        for option, value in _KEEPALIVE_OPTIONS:
+            if hasattr(socket, option):  # Not every platform exposes these
+                sock.setsockopt(socket.IPPROTO_TCP, getattr(socket, option), value)
 
     async def read_coils(self, address: int, count):
-        """Read modbus output coils (0 address prefix)."""
-        return await self._request('read_coils', address, count)
+        """Read modbus output coils (0 address prefix).
+
+        The response always returns a full byte of data, so requests for a
+        number of coils not divisible by 8 come back padded. Only the first
+        `count` of its `bits` were requested.
+        """
+        key = ('read_coils', address, count)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        generation = self._generation
+        r = await self._request('read_coils', address, count)
+        return self._store(key, r, generation)
 
     async def read_registers(self, address: int, count):
         """Read modbus registers.
 
         The Modbus protocol doesn't allow responses longer than 250 bytes
         (ie. 125 registers, 62 DF addresses), which this function manages by
-        chunking larger requests.
+        chunking larger requests. The chunks are requested together, so with
+        `pipeline` set (pymodbus 3.0 - 3.5) they can be in flight at once.
         """
-        registers = []
-        while count > 124:
-            r = await self._request('read_holding_registers', address, 124)
-            registers += r.registers
-            address, count = address + 124, count - 124
-        r = await self._request('read_holding_registers', address, count)
-        registers += r.registers
-        return registers
+        key = ('read_registers', address, count)
+        cached = self._cached(key)
+        if cached is not None:
+            return cached
+        generation = self._generation
+        responses = await asyncio.gather(*(
+            self._request('read_holding_registers', start,
+                          min(_REGISTERS_PER_READ, address + count - start))
+            for start in range(address, address + count, _REGISTERS_PER_READ)
+        ))
+        registers = list(chain.from_iterable(r.registers for r in responses))
+        return self._store(key, registers, generation)
 
     async def write_coil(self, address: int, value):
         """Write modbus coils."""
-        await self._request('write_coil', address, value)
+        await self._write('write_coil', address, value)
 
     async def write_coils(self, address: int, values):
         """Write modbus coils."""
-        await self._request('write_coils', address, values)
+        await self._write('write_coils', address, values)
 
     async def write_register(self, address: int, value, skip_encode=False):
         """Write a modbus register."""
-        await self._request('write_register', address, value, skip_encode=skip_encode)
+        await self._write('write_register', address, value, skip_encode=skip_encode)
 
     async def write_registers(self, address: int, values, skip_encode=False):
         """Write modbus registers.
 
-        The Modbus protocol doesn't allow requests longer than 250 bytes
-        (ie. 125 registers, 62 DF addresses), which this function manages by
-        chunking larger requests.
+        The Modbus protocol doesn't allow writes of more than 123 registers,
+        which this function manages by chunking larger requests. Chunks are
+        kept even so that 32-bit values are never split between requests.
+        """
+        await asyncio.gather(*(
+            self._write('write_registers', address + offset,
+                          values[offset:offset + 122], skip_encode=skip_encode)
+            for offset in range(0, len(values), 122)
+        ))
+
+    def _cached(self, key: tuple) -> Any:
+        """Return the result of a read made within `cache_ttl` seconds, if any."""
+        if not self.cache_ttl:
+            return None
+        hit = self._cache.get(key)
+        if hit is None or time.monotonic() - hit[0] >= self.cache_ttl:
+            return None
+        return hit[1]
+
+    def _store(self, key: tuple, result: Any, generation: int) -> Any:
+        """Cache a read result if `cache_ttl` is set, and return it.
+
+        Results of reads that overlapped a write (`generation` has moved on)
+        may predate it, so are not cached.
         """
-        while len(values) > 62:
-            await self._request('write_registers',
-                                address, values, skip_encode=skip_encode)
-            address, values = address + 124, values[62:]
-        await self._request('write_registers',
-                            address, values, skip_encode=skip_encode)
+        if self.cache_ttl and generation == self._generation:
+            if len(self._cache) >= _CACHE_SIZE:
+                self._cache.clear()
+            self._cache[key] = (time.monotonic(), result)
+        return result
+
+    async def _write(self, method, *args, **kwargs):
+        """Send a write request, invalidating cached reads before and after it."""
+        self._generation += 1
+        self._cache.clear()
+        try:
+            return await self._request(method, *args, **kwargs)
+        finally:
+            self._generation += 1
+            self._cache.clear()
 
     async def _request(self, method, *args, **kwargs):
         """Send a request to the device and awaits a response.
 
         This mainly ensures that requests are sent serially, as the Modbus
         protocol does not allow simultaneous requests (it'll ignore any
-        request sent while it's processing something). The driver handles this
-        by assuming there is only one client instance. If other clients
-        exist, other logic will have to be added to either prevent or manage
-        race conditions.
+        request sent while it's processing something). This only serializes
+        requests within one client. Separate clients, such as the connections
+        of a `ClickPLCPool`, are not serialized against each other, and some
+        devices drop requests that overlap across connections.
+
+        If `pipeline` is set, up to that many requests (`_PIPELINE_DEPTH` if
+        `True`) are in flight at once instead. pymodbus matches responses to
+        requests by transaction id, and requests are still sent in the order
+        they were made. Only enable this for devices known to accept
+        overlapping requests. pymodbus 3.6+ serializes requests itself, so
+        `pipeline` only has an effect on earlier versions.
         """
+        if self._closed:
+            raise TimeoutError("Not connected to PLC.")
         await self.connectTask
         async with self.lock:
-            try:
-                if self.pymodbus32plus:
-                    future = getattr(self.client, method)
-                else:
-                    future = getattr(self.client.protocol, method)  # type: ignore
-                return await future(*args, **kwargs)
-            except (asyncio.TimeoutError, pymodbus.exceptions.ConnectionException):
-                raise TimeoutError("Not connected to PLC.")
+            return await self._send(method, *args, **kwargs)
+
+    async def _send(self, method, *args, **kwargs):
+        """Send a request through pymodbus and await the response.
+
+        pymodbus bounds each attempt by `timeout` itself, retrying and then
+        reconnecting if the PLC stops answering, so no outer timeout is added.
+        """
+        try:
+            if self._methods is not None:
+                future = self._methods[method]
+            else:
+                future = getattr(self.client.protocol, method)  # type: ignore
+            return await future(*args, **kwargs)
+        except (asyncio.TimeoutError, pymodbus.exceptions.ConnectionException,
+                pymodbus.exceptions.ModbusIOException):
+            raise TimeoutError("Not connected to PLC.")
 
     async def _close(self):
-        """Close the TCP connection."""
+        """Close the TCP connection.
+
+        This is safe to call more than once, and won't wait longer than
+        `timeout` on a client that is stuck reconnecting.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self.connectTask.cancel()  # Don't let a pending connect open a socket after closing
+        with contextlib.suppress(asyncio.CancelledError, OSError):
+            await self.connectTask
         if self.pymodbus33plus:
             self.client.close()  # 3.3.x
         elif self.pymodbus30plus:
-            await self.client.close()  # type: ignore  # 3.0.x - 3.2.x
+            with contextlib.suppress(asyncio.TimeoutError):  # 3.0.x - 3.2.x
+                await asyncio.wait_for(self.client.close(), timeout=self.timeout)  # type: ignore
         else:  # 2.4.x - 2.5.x
             self.client.stop()  # type: ignore
@@ -26,6 +26,7 @@ setup(
         'pymodbus>=3.0.2,<3.7.0; python_version >= "3.10"',
     ],
     extras_require={
+        'uvloop': ['uvloop>=0.18; sys_platform != "win32"'],
         'test': [
             'pytest',
             'pytest-asyncio>=0.23.7,<=0.23.9',